@@ -1,52 +1,232 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, Response, abort
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
-from rag_system import EnhancedRAGSystem
+import time
+import atexit
+import hashlib
+import uuid
+from collections import OrderedDict
+import orjson
+from rag_singleton import get_rag
 from auth import require_auth, generate_token
+from trainer import start_training_process, start_training_thread
+from semantic_cache import SemanticCache
+from embedding_cache import EmbeddingCache
 import logging
 from datetime import datetime
 import threading
 
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, used by jsonify and request.get_json"""
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.options), mimetype='application/json')
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 
 # Initialize enhanced RAG system
-# Using environment variables for production configuration
-rag = EnhancedRAGSystem(
-    collection_name=os.getenv('COLLECTION_NAME', 'faq_documents'),
-    persist_directory=os.getenv('CHROMA_PERSIST_DIR', './chroma_db'),
-    pdf_path=os.getenv('PDF_PATH', 'data/faqs.pdf')
-)
+rag = get_rag()
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(message)s',
+    datefmt='%H:%M:%S'
+)
 logger = logging.getLogger(__name__)
 
 
-# Background task for periodic model updates
-def background_training():
-    """Periodically retrain embedding adaptor based on feedback"""
-    import time
-    while True:
-        time.sleep(3600)  # Wait 1 hour
+def _warmup():
+    """Runs dummy inputs through the models so the first request doesn't pay for lazy init"""
+    steps = [
+        ('embedding model', lambda: rag.embedding_model.encode(["warmup"])),
+        ('chroma query', lambda: rag.collection.query(query_texts=["warmup"], n_results=1)),
+    ]
+    # Each step is warmed independently so one failure doesn't skip the others
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            logger.warning("Warmup of %s failed: %s", name, e)
+    logger.info("Warmup completed")
+
+
+_warmup()
+
+
+# Cached JSON bodies for frequently polled endpoints
+HEALTH_CACHE_TTL = 1.0
+STATS_CACHE_TTL = 10.0
+_HEALTH_CACHE = {'ts': 0.0, 'body': None}
+_STATS_CACHE = {'ts': 0.0, 'feedback_count': -1, 'body': None}
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(body, mimetype='application/json')
+
+
+# The UI shell is read once at startup and served from memory with a strong ETag
+try:
+    with open(os.path.join(app.root_path, 'static', 'index.html'), 'rb') as f:
+        _INDEX = f.read()
+    _INDEX_ETAG = hashlib.sha256(_INDEX).hexdigest()
+except OSError as e:
+    logger.warning("static/index.html could not be read, / will return 404: %s", e)
+    _INDEX = None
+    _INDEX_ETAG = None
+
+
+# ISO timestamp cached at second granularity
+_TS_SEC = 0
+_TS_STR = ''
+
+
+def _now_iso() -> str:
+    global _TS_SEC, _TS_STR
+    sec = int(time.time())
+    if sec != _TS_SEC:
+        _TS_STR = datetime.fromtimestamp(sec).isoformat()
+        _TS_SEC = sec
+    return _TS_STR
+
+
+# Feedback counter used to flag when enough new feedback has arrived for training
+TRAINING_FEEDBACK_THRESHOLD = 10
+_feedback_lock = threading.Lock()
+_feedback_since_train = len(rag.feedback_data) % TRAINING_FEEDBACK_THRESHOLD
+
+
+def _atomic_incr_feedback() -> bool:
+    """Counts one feedback and returns True when the training threshold is crossed"""
+    global _feedback_since_train
+    with _feedback_lock:
+        _feedback_since_train += 1
+        if _feedback_since_train >= TRAINING_FEEDBACK_THRESHOLD:
+            _feedback_since_train = 0
+            return True
+        return False
+
+
+# Adaptor hot-reload: checks the checkpoint mtime every ADAPTOR_CHECK_INTERVAL queries
+ADAPTOR_CHECK_INTERVAL = 50
+_ADAPTOR_MTIME = os.path.getmtime(rag.adaptor_path) if os.path.exists(rag.adaptor_path) else 0.0
+_queries_since_check = 0
+_ADAPTOR_RELOAD_SUPPORTED = callable(getattr(rag, '_load_embedding_adaptor', None))
+if not _ADAPTOR_RELOAD_SUPPORTED:
+    logger.warning(
+        "%s has no _load_embedding_adaptor(), so adaptors trained by another process "
+        "could not be picked up; training stays on an in-process thread", type(rag).__name__)
+
+# Training only moves to its own process when this one can hot-reload the adaptor it writes
+TRAIN_OUT_OF_PROCESS = _ADAPTOR_RELOAD_SUPPORTED
+
+
+def _reload_adaptor_if_updated():
+    global _ADAPTOR_MTIME, _queries_since_check
+    if not _ADAPTOR_RELOAD_SUPPORTED:
+        return
+    _queries_since_check += 1
+    if _queries_since_check < ADAPTOR_CHECK_INTERVAL:
+        return
+    _queries_since_check = 0
+
+    try:
+        mtime = os.path.getmtime(rag.adaptor_path)
+    except OSError:
+        return
+    if mtime > _ADAPTOR_MTIME:
+        _ADAPTOR_MTIME = mtime
+        logger.info("Embedding adaptor checkpoint changed, reloading...")
         try:
-            logger.info("Starting background embedding adaptor training...")
-            rag.train_embedding_adaptor()
-            logger.info("Background training completed")
+            rag._load_embedding_adaptor()
+            _clear_semantic_caches()
         except Exception as e:
-            logger.error(f"Background training failed: {str(e)}")
+            logger.error("Adaptor reload failed: %s", e)
+
+
+# Persistent cache of question embeddings
+# EMBEDDING_MODEL names rag.embedding_model; change it whenever the model changes so old vectors aren't reused
+embedding_cache = EmbeddingCache(
+    os.getenv('EMBEDDING_CACHE_PATH', './embedding_cache.sqlite3'),
+    model_id=os.getenv('EMBEDDING_MODEL', 'default')
+)
+
+
+# Semantic answer cache for repeated and paraphrased questions (one per adaptor setting)
+semantic_caches = {}
+if os.getenv('ENABLE_SEMANTIC_CACHE', 'true').lower() == 'true':
+    semantic_caches = {
+        use_adaptor: SemanticCache(
+            threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.86)),
+            max_size=int(os.getenv('SEMANTIC_CACHE_SIZE', 4096))
+        )
+        for use_adaptor in (True, False)
+    }
 
 
-# Start background thread
-if os.getenv('ENABLE_BACKGROUND_TRAINING', 'true').lower() == 'true':
-    training_thread = threading.Thread(target=background_training, daemon=True)
-    training_thread.start()
+def _clear_semantic_caches():
+    for cache in semantic_caches.values():
+        cache.clear()
+
+
+def _semantic_lookup(cache, question: str):
+    """Returns (question_embedding, cached_answer); fails open to (None, None)"""
+    try:
+        embedding = embedding_cache.encode(rag.embedding_model, [question], normalize_embeddings=True)[0]
+        return embedding, cache.lookup(embedding)
+    except Exception as e:
+        logger.warning("Semantic cache lookup failed, running the full pipeline: %s", e)
+        return None, None
+
+
+# Cache hits get a fresh query_id; this maps it back to the query whose answer was served
+LOW_RATING_THRESHOLD = 2
+_CACHE_HIT_ORIGINS_SIZE = 4096
+_cache_hit_origins = OrderedDict()
+_cache_hit_origins_lock = threading.Lock()
+
+
+def _record_cache_hit(query_id: str, original_query_id: str):
+    with _cache_hit_origins_lock:
+        _cache_hit_origins[query_id] = original_query_id
+        if len(_cache_hit_origins) > _CACHE_HIT_ORIGINS_SIZE:
+            _cache_hit_origins.popitem(last=False)
+
+
+def _resolve_query_id(query_id: str) -> str:
+    """Returns the query_id rag knows about: the original query for cache hits, else query_id"""
+    with _cache_hit_origins_lock:
+        return _cache_hit_origins.get(query_id, query_id)
+
+
+def _invalidate_cached_answer(query_id: str):
+    """Stops serving the answer a low-rated query received"""
+    for cache in semantic_caches.values():
+        cache.invalidate(query_id)
 
 
 @app.route('/')
 def index():
-    return send_from_directory('static', 'index.html')
+    if _INDEX is None:
+        abort(404)
+    resp = Response(_INDEX, mimetype='text/html')
+    resp.set_etag(_INDEX_ETAG)
+    resp.cache_control.max_age = 300
+    return resp.make_conditional(request)
 
 
 @app.route('/auth/token', methods=['POST'])
@@ -81,20 +261,35 @@ def ask_question():
         if not question:
             return jsonify({'error': 'Question is required'}), 400
 
-        logger.info(f"Processing question: {question}")
+        logger.info("Processing question: %s", question)
+
+        _reload_adaptor_if_updated()
 
-        result = rag.query(question, use_adaptor=use_adaptor)
+        cache = semantic_caches.get(bool(use_adaptor))
+        question_embedding, cached = None, None
+        if cache is not None:
+            question_embedding, cached = _semantic_lookup(cache, question)
+
+        if cached is not None:
+            result = dict(cached)
+            result['query_id'] = str(uuid.uuid4())
+            _record_cache_hit(result['query_id'], cached.get('query_id'))
+        else:
+            result = rag.query(question, use_adaptor=use_adaptor)
+            if question_embedding is not None:
+                cache.add(question_embedding, dict(result))
 
         result['metadata'] = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _now_iso(),
             'use_adaptor': use_adaptor,
-            'model_version': '2.0'
+            'model_version': '2.0',
+            'cache_hit': cached is not None
         }
 
         return jsonify(result)
 
     except Exception as e:
-        logger.error(f"Error processing question: {str(e)}")
+        logger.error("Error processing question: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 
@@ -120,31 +315,34 @@ def submit_feedback():
         if not isinstance(rating, int) or not 1 <= rating <= 5:
             return jsonify({'error': 'Rating must be an integer between 1 and 5'}), 400
 
+        # Feedback on a cached answer is attributed to the query that produced it
+        query_id = _resolve_query_id(query_id)
+
         # If question or sources are missing, retrieve from query_info
         if not question or not sources:
-            logger.info(f"Missing question or sources in request, retrieving from query_info for {query_id}")
+            logger.info("Missing question or sources in request, retrieving from query_info for %s", query_id)
             query_info = rag.get_query_info(query_id)
 
             if not query_info:
-                logger.warning(f"No query info found for query_id: {query_id}")
+                logger.warning("No query info found for query_id: %s", query_id)
                 return jsonify({'error': f'Query information not found for query_id: {query_id}'}), 400
 
             # Use fallback values if not provided in request
             if not question:
                 question = query_info.get('question')
-                logger.info(f"Retrieved question from query_info: {question[:50]}...")
+                logger.info("Retrieved question from query_info: %.50s...", question)
 
             if not sources:
                 sources = query_info.get('sources_used', [])
-                logger.info(f"Retrieved {len(sources)} sources from query_info")
+                logger.info("Retrieved %d sources from query_info", len(sources))
 
         # Final validation
         if not question:
             return jsonify({'error': 'Question not found in request or query info'}), 400
 
-        print("SOURCES LENGTH FROM APP: ", len(sources))
-        logger.info(
-            f"Storing feedback for query {query_id}: rating={rating}, question_length={len(question)}, sources_count={len(sources)}")
+        logger.debug("Sources length from app: %d", len(sources))
+        logger.info("Storing feedback for query %s: rating=%s, question_length=%d, sources_count=%d",
+                    query_id, rating, len(question), len(sources))
 
         # Store feedback with complete information
         feedback_id = rag.store_feedback(query_id, question, rating, comment, sources)
@@ -154,19 +352,22 @@ def submit_feedback():
             'feedback_id': feedback_id,
             'rating': rating,
             'comment': comment,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': _now_iso()
         }
         rag.update_query_feedback(query_id, feedback_data)
+        if rating <= LOW_RATING_THRESHOLD:
+            _invalidate_cached_answer(query_id)
+        trigger_training = _atomic_incr_feedback()
 
         return jsonify({
             'message': 'Feedback stored successfully',
-            'trigger_training': len(rag.feedback_data) % 10 == 0,
+            'trigger_training': trigger_training,
             'sources_used': len(sources),
             'question_retrieved': question is not None
         })
 
     except Exception as e:
-        logger.error(f"Error storing feedback: {str(e)}")
+        logger.error("Error storing feedback: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/stats', methods=['GET'])
@@ -174,10 +375,18 @@ def submit_feedback():
 def get_stats():
     """Get feedback statistics"""
     try:
-        stats = rag.get_feedback_stats()
-        return jsonify(stats)
+        now = time.monotonic()
+        feedback_count = len(rag.feedback_data)
+        if (_STATS_CACHE['body'] is not None
+                and _STATS_CACHE['feedback_count'] == feedback_count
+                and now - _STATS_CACHE['ts'] < STATS_CACHE_TTL):
+            return _json_response(_STATS_CACHE['body'])
+
+        body = orjson.dumps(rag.get_feedback_stats(), option=OrjsonProvider.options)
+        _STATS_CACHE.update(ts=now, feedback_count=feedback_count, body=body)
+        return _json_response(body)
     except Exception as e:
-        logger.error(f"Error getting stats: {str(e)}")
+        logger.error("Error getting stats: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/admin/reindex', methods=['POST'])
@@ -192,19 +401,24 @@ def reindex_documents():
         rag.chroma_client.delete_collection(rag.collection_name)
         rag._initialize_collection()
         rag._load_and_index_documents()
+        _clear_semantic_caches()
 
         return jsonify({
             'message': 'Documents reindexed successfully',
             'document_count': rag.collection.count()
         })
     except Exception as e:
-        logger.error(f"Error reindexing: {str(e)}")
+        logger.error("Error reindexing: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Enhanced health check with system status"""
+    now = time.monotonic()
+    if _HEALTH_CACHE['body'] is not None and now - _HEALTH_CACHE['ts'] < HEALTH_CACHE_TTL:
+        return _json_response(_HEALTH_CACHE['body'])
+
     try:
         status = {
             'status': 'healthy',
@@ -216,7 +430,9 @@ def health_check():
             },
             'version': 2.0
         }
-        return jsonify(status)
+        body = orjson.dumps(status, option=OrjsonProvider.options)
+        _HEALTH_CACHE.update(ts=now, body=body)
+        return _json_response(body)
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
@@ -226,4 +442,16 @@ def health_check():
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=os.getenv('DEBUG', 'False').lower() == 'true')
\ No newline at end of file
+    debug = os.getenv('DEBUG', 'False').lower() == 'true'
+
+    # Under gunicorn training is started by the hooks in gunicorn.conf.py.
+    # With the debug reloader, only the serving child process starts it.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if TRAIN_OUT_OF_PROCESS:
+            training_process = start_training_process()
+            if training_process is not None:
+                atexit.register(training_process.terminate)
+        else:
+            start_training_thread(rag, on_trained=_clear_semantic_caches)
+
+    app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
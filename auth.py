@@ -1,29 +1,69 @@
-from typing import Dict, Any
+from typing import Optional, Tuple
 
-import jwt
+import base64
+import hashlib
+import hmac
+import json
+import math
 import os
-from datetime import datetime, timedelta
-from functools import wraps
+import time
+from functools import wraps, lru_cache
 from flask import request, jsonify
 
 SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
+KEY = SECRET_KEY.encode()
+
+TOKEN_LIFETIME = 24 * 3600
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b'=' * (-len(data) % 4))
+
+
+# The header never changes, so it is encoded once
+HEADER_B64 = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+
+
+def _sign(signing_input: bytes) -> bytes:
+    return hmac.new(KEY, signing_input, hashlib.sha256).digest()
 
 
 def generate_token(username: str) -> str:
     payload = {
         'username': username,
-        'exp': datetime.utcnow() + timedelta(hours=24)
+        'exp': int(time.time()) + TOKEN_LIFETIME
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
+    payload_b64 = _b64url_encode(json.dumps(payload, separators=(',', ':')).encode())
+    signing_input = HEADER_B64 + b'.' + payload_b64
+    return (signing_input + b'.' + _b64url_encode(_sign(signing_input))).decode()
 
 
-def verify_token(token: str) -> Dict[str, Any]:
+@lru_cache(maxsize=4096)
+def verify_token(token: str) -> Optional[Tuple[str, float]]:
+    """
+    Verifies the HS256 signature and returns (username, exp_timestamp).
+    Results are cached per token, so expiry must be checked by the caller.
+    Call verify_token.cache_clear() when SECRET_KEY is rotated.
+    """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return payload
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
+        signing_input, signature_b64 = token.encode().rsplit(b'.', 1)
+        header_b64, payload_b64 = signing_input.split(b'.')
+        if header_b64 != HEADER_B64:
+            return None
+        # Compare the encoded form so only the canonical signature encoding is accepted
+        if not hmac.compare_digest(_b64url_encode(_sign(signing_input)), signature_b64):
+            return None
+        payload = json.loads(_b64url_decode(payload_b64))
+        exp = payload['exp']
+        # Like PyJWT, exp must be a finite number; strings, bools and NaN/Infinity are rejected
+        if isinstance(exp, bool) or not isinstance(exp, (int, float)) or not math.isfinite(exp):
+            return None
+        return payload.get('username'), float(exp)
+    except (ValueError, KeyError, TypeError, AttributeError):
         return None
 
 
@@ -32,18 +72,17 @@ def require_auth(f):
 
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
+        auth_header = request.headers.get('Authorization', '')
 
-        if not token:
+        if not auth_header:
             return jsonify({'error': 'Token is missing'}), 401
 
-        if token.startswith('Bearer '):
-            token = token[7:]
+        token = auth_header[7:] if auth_header[:7] == 'Bearer ' else auth_header
 
-        payload = verify_token(token)
-        if not payload:
+        verified = verify_token(token.strip())
+        if not verified or verified[1] <= time.time():
             return jsonify({'error': 'Token is invalid or expired'}), 401
 
         return f(*args, **kwargs)
 
-    return decorated
\ No newline at end of file
+    return decorated
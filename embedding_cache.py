@@ -0,0 +1,138 @@
+import atexit
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by the SHA-256 of the model tag and text
+    - Only texts missing from the cache are sent to the embedding model
+    - The key includes model_id and the encode kwargs, so changing either never reuses old vectors;
+      model_id must name the model passed to encode (e.g. its checkpoint name)
+    - Recent embeddings are served from a bounded in-memory LRU
+    - New embeddings are written to SQLite by a background thread every
+      flush_interval seconds, so no commit happens on the request path
+    - The SQLite table is trimmed to the newest max_entries rows on every flush
+    - SQLite errors are logged and treated as cache misses
+    """
+
+    def __init__(self, path: str, model_id: str, max_entries: int = 100000,
+                 memory_entries: int = 4096, flush_interval: float = 5.0):
+        self.path = path
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.flush_interval = flush_interval
+        self._memory = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._pid = None
+        self._conn = None
+        self._worker_pid = None
+        atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not be shared across fork (gunicorn --preload)
+        if self._pid != os.getpid():
+            self._conn = sqlite3.connect(self.path, timeout=1.0, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)')
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def _ensure_worker(self):
+        # Threads don't survive fork, so each process starts its own flusher
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                threading.Thread(target=self._run, daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _tag(self, encode_kwargs) -> bytes:
+        return f"{self.model_id}:{sorted(encode_kwargs.items())!r}".encode()
+
+    @staticmethod
+    def _key(tag: bytes, text: str) -> bytes:
+        return hashlib.sha256(tag + b'\0' + text.encode()).digest()
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get(self, key: bytes):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                return vector
+
+        try:
+            with self._db_lock:
+                row = self._connection().execute('SELECT vector FROM embeddings WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache read failed: %s", e)
+            return None
+        if row is None:
+            return None
+
+        vector = np.frombuffer(row[0], dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+        return vector
+
+    def encode(self, model, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """Same as model.encode(texts, **encode_kwargs) but reuses cached embeddings"""
+        self._ensure_worker()
+        tag = self._tag(encode_kwargs)
+        keys = [self._key(tag, text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+
+        misses = [i for i, vector in enumerate(vectors) if vector is None]
+        if misses:
+            new = np.asarray(model.encode([texts[i] for i in misses], **encode_kwargs), dtype=np.float32)
+            with self._lock:
+                for j, i in enumerate(misses):
+                    vectors[i] = new[j]
+                    self._remember(keys[i], new[j])
+                    self._pending[keys[i]] = new[j].tobytes()
+
+        return np.vstack(vectors)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Writes pending embeddings to SQLite and trims the table to max_entries"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            with self._db_lock:
+                conn = self._connection()
+                conn.executemany('INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)', pending.items())
+                # Replaced rows get a new rowid, so rowid order is insertion order
+                conn.execute('DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?',
+                             (self.max_entries,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache flush failed, dropping %d embeddings: %s", len(pending), e)
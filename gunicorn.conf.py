@@ -0,0 +1,37 @@
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+
+# A single worker process: feedback, query_info, the feedback counter and the
+# in-process caches all live in memory and are persisted to local JSON files,
+# so several workers would overwrite each other's data. Scale with threads.
+workers = 1
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+preload_app = True
+timeout = 120
+
+
+def on_starting(server):
+    # preload_app has already imported the app, so this reads the loaded module.
+    # The trainer runs as its own process, started once by the master instead of at app import,
+    # unless the app can't hot-reload adaptors; then each worker trains on a thread (post_fork)
+    from app import TRAIN_OUT_OF_PROCESS
+    if TRAIN_OUT_OF_PROCESS:
+        from trainer import start_training_process
+        server.training_process = start_training_process()
+
+
+def post_fork(server, worker):
+    # Threads don't survive fork, so the in-process trainer is started in the worker
+    from app import TRAIN_OUT_OF_PROCESS, rag, _clear_semantic_caches
+    if not TRAIN_OUT_OF_PROCESS:
+        from trainer import start_training_thread
+        start_training_thread(rag, on_trained=_clear_semantic_caches)
+
+
+def on_exit(server):
+    training_process = getattr(server, 'training_process', None)
+    if training_process is not None:
+        training_process.terminate()
+        training_process.wait(timeout=10)
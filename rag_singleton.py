@@ -0,0 +1,28 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+from rag_system import EnhancedRAGSystem
+
+
+def create_rag(persist_directory: Optional[str] = None) -> EnhancedRAGSystem:
+    """
+    Builds a new RAG system from environment configuration
+    persist_directory overrides CHROMA_PERSIST_DIR, e.g. for the trainer's snapshot.
+    """
+    # Using environment variables for production configuration
+    return EnhancedRAGSystem(
+        collection_name=os.getenv('COLLECTION_NAME', 'faq_documents'),
+        persist_directory=persist_directory or os.getenv('CHROMA_PERSIST_DIR', './chroma_db'),
+        pdf_path=os.getenv('PDF_PATH', 'data/faqs.pdf')
+    )
+
+
+@lru_cache(maxsize=1)
+def get_rag() -> EnhancedRAGSystem:
+    """
+    Process-wide shared RAG system
+    Every entry point importing this gets the same instance, so the PDF,
+    Chroma collection and models are only loaded once per process.
+    """
+    return create_rag()
@@ -0,0 +1,76 @@
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question embeddings
+    - Questions are matched by cosine similarity against stored centroids
+    - A hit above the threshold returns the stored answer without running the pipeline
+    - Centroids live in a preallocated ring buffer, so once max_size is
+      reached the oldest entry is overwritten (FIFO eviction)
+    - Entries can be invalidated by the query_id of their answer
+    """
+
+    def __init__(self, threshold: float = 0.86, max_size: int = 4096):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._centroids = None  # (max_size, D) float32, L2-normalized, allocated on first add
+        self._answers = [None] * max_size
+        self._next = 0
+        self._count = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, embedding) -> Optional[Dict[str, Any]]:
+        q = self._normalize(embedding)
+        with self._lock:
+            if self._count == 0 or q.shape[0] != self._centroids.shape[1]:
+                return None
+            sims = self._centroids[:self._count] @ q
+            best = int(np.argmax(sims))
+            if sims[best] >= self.threshold:
+                return self._answers[best]
+        return None
+
+    def add(self, embedding, answer: Dict[str, Any]):
+        q = self._normalize(embedding)
+        with self._lock:
+            if self._centroids is None or q.shape[0] != self._centroids.shape[1]:
+                self._reset(q.shape[0])
+            self._centroids[self._next] = q
+            self._answers[self._next] = answer
+            self._next = (self._next + 1) % self.max_size
+            self._count = min(self._count + 1, self.max_size)
+
+    def invalidate(self, query_id: str):
+        """Drops every entry whose answer has the given query_id"""
+        with self._lock:
+            for i in range(self._count):
+                answer = self._answers[i]
+                if answer is not None and answer.get('query_id') == query_id:
+                    self._answers[i] = None
+                    self._centroids[i] = 0.0  # Zero similarity never reaches the threshold
+
+    def clear(self):
+        with self._lock:
+            self._centroids = None
+            self._answers = [None] * self.max_size
+            self._next = 0
+            self._count = 0
+
+    def __len__(self):
+        return sum(answer is not None for answer in self._answers)
+
+    def _reset(self, dim: int):
+        self._centroids = np.zeros((self.max_size, dim), dtype=np.float32)
+        self._answers = [None] * self.max_size
+        self._next = 0
+        self._count = 0
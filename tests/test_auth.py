@@ -0,0 +1,87 @@
+import json
+import time
+
+import pytest
+from flask import Flask
+
+import auth
+
+
+def _token_for(payload, header_b64=auth.HEADER_B64):
+    payload_b64 = auth._b64url_encode(json.dumps(payload, separators=(',', ':')).encode())
+    signing_input = header_b64 + b'.' + payload_b64
+    return (signing_input + b'.' + auth._b64url_encode(auth._sign(signing_input))).decode()
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    auth.verify_token.cache_clear()
+    yield
+    auth.verify_token.cache_clear()
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route('/protected')
+    @auth.require_auth
+    def protected():
+        return 'ok'
+
+    return app.test_client()
+
+
+def test_round_trip():
+    username, exp = auth.verify_token(auth.generate_token('demo'))
+    assert username == 'demo'
+    assert exp > time.time()
+
+
+def test_tampered_signature_rejected():
+    token = auth.generate_token('demo')
+    signing_input, signature = token.rsplit('.', 1)
+    flipped = ('A' if signature[0] != 'A' else 'B') + signature[1:]
+    assert auth.verify_token(signing_input + '.' + flipped) is None
+
+
+def test_tampered_payload_rejected():
+    token = auth.generate_token('demo')
+    _, _, signature = token.split('.')
+    forged = _token_for({'username': 'admin', 'exp': int(time.time()) + 3600})
+    assert auth.verify_token(forged.rsplit('.', 1)[0] + '.' + signature) is None
+
+
+@pytest.mark.parametrize('padding', ['=', '=='])
+def test_padded_signature_rejected(padding):
+    assert auth.verify_token(auth.generate_token('demo') + padding) is None
+
+
+def test_wrong_header_rejected():
+    header_b64 = auth._b64url_encode(b'{"alg":"none","typ":"JWT"}')
+    token = _token_for({'username': 'demo', 'exp': int(time.time()) + 3600}, header_b64=header_b64)
+    assert auth.verify_token(token) is None
+
+
+@pytest.mark.parametrize('exp', ['nan', 'inf', '123', True, None, float('nan'), float('inf')])
+def test_non_finite_or_non_numeric_exp_rejected(exp):
+    assert auth.verify_token(_token_for({'username': 'demo', 'exp': exp})) is None
+
+
+def test_missing_exp_rejected():
+    assert auth.verify_token(_token_for({'username': 'demo'})) is None
+
+
+def test_valid_token_accepted(client):
+    token = auth.generate_token('demo')
+    assert client.get('/protected', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+
+
+def test_expired_token_rejected(client):
+    token = _token_for({'username': 'demo', 'exp': int(time.time()) - 10})
+    assert auth.verify_token(token) is not None  # signature is fine, only the expiry fails
+    assert client.get('/protected', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+
+
+def test_missing_token_rejected(client):
+    assert client.get('/protected').status_code == 401
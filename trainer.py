@@ -0,0 +1,93 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRAINING_INTERVAL = 3600  # Wait 1 hour between runs
+
+
+def _training_enabled() -> bool:
+    return os.getenv('ENABLE_BACKGROUND_TRAINING', 'true').lower() == 'true'
+
+
+def _train_on_snapshot():
+    """
+    Trains a freshly built RAG system against a private copy of the Chroma store
+    The web process owns CHROMA_PERSIST_DIR, so the trainer never opens it:
+    any indexing the constructor does lands in a throwaway snapshot. The
+    feedback files are only read here, and the sole file the trainer writes
+    is adaptor_path, which the web process reloads.
+    """
+    from rag_singleton import create_rag
+
+    persist_directory = os.getenv('CHROMA_PERSIST_DIR', './chroma_db')
+    with tempfile.TemporaryDirectory(prefix='chroma-snapshot-') as tmp:
+        snapshot = os.path.join(tmp, 'chroma_db')
+        if os.path.isdir(persist_directory):
+            shutil.copytree(persist_directory, snapshot)
+        trainer = create_rag(persist_directory=snapshot)
+        trainer.train_embedding_adaptor()
+        del trainer
+
+
+# Background task for periodic model updates
+def background_training(rag=None, on_trained=None):
+    """
+    Periodically retrain embedding adaptor based on feedback
+    With a rag, trains that instance in place (the in-process thread).
+    Without one, runs as its own process (python trainer.py), so training
+    never holds the web process' GIL; the RAG system is rebuilt for every run
+    so it trains on the feedback persisted since the last run, and released
+    afterwards so the second copy of the models only lives for the duration
+    of training. The web process picks the adaptor up through
+    _reload_adaptor_if_updated.
+    """
+    while True:
+        time.sleep(TRAINING_INTERVAL)
+        try:
+            logger.info("Starting background embedding adaptor training...")
+            if rag is None:
+                _train_on_snapshot()
+            else:
+                rag.train_embedding_adaptor()
+            if on_trained is not None:
+                on_trained()
+            logger.info("Background training completed")
+        except Exception as e:
+            logger.error("Background training failed: %s", e)
+
+
+def start_training_process():
+    """
+    Starts the trainer as a separate interpreter
+    Returns the Popen handle, or None if ENABLE_BACKGROUND_TRAINING is off.
+    A plain subprocess is used instead of multiprocessing so forked web
+    workers don't inherit it as a child they try to terminate and join on exit.
+    """
+    if not _training_enabled():
+        return None
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__)])
+
+
+def start_training_thread(rag, on_trained=None):
+    """
+    Starts in-process training of rag on a daemon thread
+    Returns the thread, or None if ENABLE_BACKGROUND_TRAINING is off. Used when
+    the web process can't hot-reload an adaptor trained by another process.
+    """
+    if not _training_enabled():
+        return None
+    thread = threading.Thread(target=background_training, args=(rag, on_trained), daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    background_training()